@@ -8,6 +8,25 @@ Authors: SAFAR Fatima Ezzahra, ELANSARI Zineb
 Institution: UM6P College of Computing, Mohammed VI Polytechnic University
 """
 
+import sys
+from collections import namedtuple
+from functools import cache, lru_cache
+from itertools import repeat
+from types import MappingProxyType
+
+import numpy as np
+from numba import njit, prange
+
+
+# Result of running the PDA over a whole scanpath (see ECGPDA.run)
+RunResult = namedtuple('RunResult', ['accepted', 'max_depth', 'final_state',
+                                     'verification_count'])
+
+# Source "file name" of generated step() functions (see
+# ECGPDA._specialize_step), used to tell them from hand-written overrides
+_STEP_FILENAME = "<ECGPDA.step>"
+
+
 class ECGPDA:
     """
     7-state PDA for detecting incomplete verification in ECG interpretation.
@@ -20,33 +39,42 @@ class ECGPDA:
     - F = {q6} (accepting state)
     """
     
+    # The model is shared by all instances, so it is immutable
+    
+    # States
+    Q = frozenset({'q0', 'q1', 'q2', 'q3', 'q4', 'q5', 'q6'})
+    q0 = 'q0'
+    F = frozenset({'q6'})
+    
+    # Input alphabet (from paper Section III.B)
+    sigma_leads = ('I', 'II', 'III', 'aR', 'aL', 'aF',
+                   'V1', 'V2', 'V3', 'V4', 'V5', 'V6')
+    sigma_features = ('P', 'Q', 'S', 'T', 'R')
+    sigma_actions = ('O', 'C', 'A')
+    sigma_verification = ('V', '✓')
+    
+    # Stack alphabet
+    gamma = frozenset({'Z0', 'Rm', 'Lm', 'Fm', 'Vm'})
+    
     def __init__(self):
-        # States
-        self.Q = {'q0', 'q1', 'q2', 'q3', 'q4', 'q5', 'q6'}
-        self.q0 = 'q0'
-        self.F = {'q6'}
-        
-        # Input alphabet (from paper Section III.B)
-        self.sigma_leads = ['I', 'II', 'III', 'aR', 'aL', 'aF', 
-                           'V1', 'V2', 'V3', 'V4', 'V5', 'V6']
-        self.sigma_features = ['P', 'Q', 'S', 'T', 'R']
-        self.sigma_actions = ['O', 'C', 'A']
-        self.sigma_verification = ['V', '✓']
-        
-        # Stack alphabet
-        self.gamma = {'Z0', 'Rm', 'Lm', 'Fm', 'Vm'}
-        
-        # Build transition function (47 transitions from paper)
-        self.delta = self._build_transitions()
-        
-        # Current configuration
-        self.current_state = self.q0
-        self.stack = ['Z0']
-        
-    def _build_transitions(self):
+        # δ (47 transitions from paper), its compiled tables and step() are
+        # class attributes built when the class is defined (see
+        # __init_subclass__), so instances only hold the configuration.
+        self.reset()
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # A subclass may override _build_transitions(), so it gets its own
+        # compiled tables and step()
+        cls._compile_transitions()
+        
+    @classmethod
+    @cache
+    def _build_transitions(cls):
         """
         Build the complete transition table (47 transitions).
-        Returns: dict mapping (state, symbol, stack_top) -> (new_state, stack_action)
+        Returns: read-only mapping (state, symbol, stack_top) ->
+                 (new_state, stack_action), with stack_action a tuple
         """
         delta = {}
         
@@ -59,14 +87,14 @@ class ECGPDA:
         delta[('q2', 'R', 'Rm')] = ('q2', ['Rm'])  # Continue rhythm assessment
         
         # Phase 3: Detailed Examination - Lead level (Equation 26)
-        for lead in self.sigma_leads:
+        for lead in cls.sigma_leads:
             delta[('q2', lead, 'Rm')] = ('q3', ['Lm', 'Rm'])
             delta[('q3', lead, 'Lm')] = ('q3', ['Lm'])
             # Allow transition to new lead from feature state
             delta[('q4', lead, 'Fm')] = ('q3', ['Lm', 'Rm'])
         
         # Phase 4: Feature Examination (Equation 27)
-        for feat in self.sigma_features:
+        for feat in cls.sigma_features:
             delta[('q3', feat, 'Lm')] = ('q4', ['Fm', 'Lm'])
             delta[('q4', feat, 'Fm')] = ('q4', ['Fm'])
         
@@ -81,12 +109,12 @@ class ECGPDA:
         delta[('q5', '✓', 'Rm')] = ('q5', ['Rm'])  # Confirm but keep Rm
         
         # Allow revisiting leads/features during verification with any stack state
-        for lead in self.sigma_leads:
+        for lead in cls.sigma_leads:
             delta[('q5', lead, 'Vm')] = ('q5', ['Vm'])
             delta[('q5', lead, 'Rm')] = ('q5', ['Rm'])
             delta[('q5', lead, 'Lm')] = ('q5', ['Lm'])
             delta[('q5', lead, 'Fm')] = ('q5', ['Fm'])
-        for feat in self.sigma_features:
+        for feat in cls.sigma_features:
             delta[('q5', feat, 'Vm')] = ('q5', ['Vm'])
             delta[('q5', feat, 'Fm')] = ('q5', ['Fm'])
             delta[('q5', feat, 'Lm')] = ('q5', ['Lm'])
@@ -97,15 +125,112 @@ class ECGPDA:
         delta[('q5', 'O', 'Lm')] = ('q6', ['Z0'])  # Can complete from any verification level
         delta[('q5', 'O', 'Fm')] = ('q6', ['Z0'])
         
-        return delta
+        return MappingProxyType({key: (new_state, tuple(stack_action))
+                                 for key, (new_state, stack_action) in delta.items()})
     
-    def reset(self):
-        """Reset PDA to initial configuration"""
-        self.current_state = self.q0
-        self.stack = ['Z0']
+    @classmethod
+    def _compile_transitions(cls):
+        """
+        Encode δ as dense integer lookup tables (once per class).
+        
+        States, input symbols and stack symbols are mapped to contiguous
+        small-int IDs so that a transition is a single array index:
+        - dstate[q, a, X]: successor state ID (-1 = no transition)
+        - daction[q, a, X]: index into actions_tbl
+        - actions_tbl: stack symbol IDs to push, already reversed so the
+          leftmost symbol of the stack action ends up on top
+        - dstay[q, X]: bitmask over symbol IDs of "stay" transitions, i.e.
+          (q, a, X) -> (q, [X]). These no-ops (mostly the q5 revisit loops)
+          are kept out of dstate/daction and checked only on a table miss.
+        
+        Also installs the step() generated by _specialize_step(), unless
+        the class defines or inherits a hand-written step().
+        """
+        # Everything is built in locals and published on the class only once
+        # complete and read-only, so the class never exposes half-filled tables.
+        delta = cls._build_transitions()
+        
+        states = tuple(sorted(cls.Q))
+        stack_symbols = ('Z0', 'Rm', 'Lm', 'Fm', 'Vm')
+        # 'R' is both a feature and the rhythm symbol, so de-duplicate.
+        # Interned so lookups with interned input symbols match by identity
+        # ('✓' is not auto-interned by CPython like the ASCII names are).
+        alphabet = (cls.sigma_leads + cls.sigma_features +
+                    cls.sigma_actions + cls.sigma_verification)
+        symbols = list(dict.fromkeys(map(sys.intern, alphabet)))
+        
+        state_id = {q: i for i, q in enumerate(states)}
+        sym_id = {a: i for i, a in enumerate(symbols)}
+        stack_id = {X: i for i, X in enumerate(stack_symbols)}
+        
+        shape = (len(states), len(symbols), len(stack_symbols))
+        dstate = np.full(shape, -1, dtype=np.int8)
+        daction = np.full(shape, -1, dtype=np.int16)
+        dstay = np.zeros(shape[::2], dtype=np.int64)
+        actions_tbl = []
+        action_index = {}
+        
+        for (state, symbol, stack_top), (new_state, stack_action) in delta.items():
+            if new_state == state and stack_action == (stack_top,):
+                dstay[state_id[state], stack_id[stack_top]] |= 1 << sym_id[symbol]
+                continue
+            
+            push = tuple(stack_id[X] for X in reversed(stack_action))
+            if push not in action_index:
+                action_index[push] = len(actions_tbl)
+                actions_tbl.append(push)
+            
+            idx = (state_id[state], sym_id[symbol], stack_id[stack_top])
+            dstate[idx] = state_id[new_state]
+            daction[idx] = action_index[push]
+        
+        # Flattened copy of actions_tbl for run_pda
+        actions_len = np.array([len(a) for a in actions_tbl], dtype=np.int8)
+        actions_off = np.zeros(len(actions_tbl), dtype=np.int32)
+        actions_off[1:] = np.cumsum(actions_len)[:-1]
+        actions_flat = np.array([X for a in actions_tbl for X in a], dtype=np.int8)
+        
+        for table in (dstate, daction, dstay, actions_len, actions_off, actions_flat):
+            table.flags.writeable = False
+        
+        cls.delta = delta
+        cls.states = states
+        cls.stack_symbols = stack_symbols
+        cls.state_id = MappingProxyType(state_id)
+        cls.sym_id = MappingProxyType(sym_id)
+        cls.stack_id = MappingProxyType(stack_id)
+        cls.dstate = dstate
+        cls.daction = daction
+        cls.dstay = dstay
+        cls.actions_tbl = tuple(actions_tbl)
+        cls.actions_len = actions_len
+        cls.actions_off = actions_off
+        cls.actions_flat = actions_flat
+        
+        # IDs used on every run. F = {q6} has a single accepting state, so
+        # acceptance is an integer compare rather than a set lookup.
+        cls._q0 = state_id[cls.q0]
+        cls._q6 = state_id['q6']
+        cls._z0 = stack_id['Z0']
+        cls._check = sym_id['✓']
+        
+        step = getattr(cls, 'step', None)
+        if step is None or step.__code__.co_filename == _STEP_FILENAME:
+            cls.step = cls._specialize_step()
     
-    def step(self, symbol):
+    @classmethod
+    def _specialize_step(cls):
         """
+        Generate a version of step() specialized to the compiled δ.
+        
+        The transition tables are unrolled into nested if/elif branches on
+        (state, stack_top), with the symbols of each branch compared against
+        constants, so the interpreter runs straight-line code with no table
+        lookups.
+        
+        Returns: step function, installed as the class's step() method
+        """
+        doc = """
         Process one input symbol (single transition).
         
         Args:
@@ -114,28 +239,213 @@ class ECGPDA:
         Returns:
             bool: True if transition succeeded, False if no valid transition
         """
-        if not self.stack:
-            return False
+        lines = ["def step(self, symbol):",
+                 "    sp = self._sp",
+                 "    if sp == 0:",
+                 "        return False",
+                 "    stack = self._stack",
+                 "    cs = self._cs",
+                 "    top = stack[sp - 1]"]
+        namespace = {}
+        
+        state_kw = "if"
+        for q in range(len(cls.states)):
+            top_kw = "if"
+            state_lines = []
+            for X in range(len(cls.stack_symbols)):
+                # Group symbols by transition so each group is one branch
+                groups = {}
+                for symbol, a in cls.sym_id.items():
+                    if cls.dstate[q, a, X] >= 0:
+                        key = (int(cls.dstate[q, a, X]),
+                               cls.actions_tbl[cls.daction[q, a, X]])
+                        groups.setdefault(key, []).append(symbol)
+                stay = [symbol for symbol, a in cls.sym_id.items()
+                        if cls.dstay[q, X] >> a & 1]
+                if not groups and not stay:
+                    continue
+                
+                state_lines.append(f"        {top_kw} top == {X}:")
+                top_kw = "elif"
+                symbol_kw = "if"
+                for (new_state, push), symbols in groups.items():
+                    if len(symbols) == 1:
+                        test = f"symbol == {symbols[0]!r}"
+                    else:
+                        name = f"_SYMBOLS_{len(namespace)}"
+                        namespace[name] = frozenset(symbols)
+                        test = f"symbol in {name}"
+                    state_lines.append(f"            {symbol_kw} {test}:")
+                    symbol_kw = "elif"
+                    
+                    body = []
+                    if new_state != q:
+                        body.append(f"self._cs = {new_state}")
+                    if len(push) == 0:
+                        body.append("self._sp = sp - 1")
+                    elif len(push) == 1:
+                        if push[0] != X:
+                            body.append(f"stack[sp - 1] = {push[0]}")
+                    else:
+                        body += ["if sp == len(stack):",
+                                 "    stack.extend(bytes(len(stack)))",
+                                 f"stack[sp - 1] = {push[0]}",
+                                 f"stack[sp] = {push[1]}",
+                                 "self._sp = sp + 1"]
+                    body.append("return True")
+                    state_lines += ["                " + line for line in body]
+                
+                if stay:
+                    # No-op transitions: state and stack are unchanged
+                    name = f"_SYMBOLS_{len(namespace)}"
+                    namespace[name] = frozenset(stay)
+                    state_lines.append(f"            return symbol in {name}")
+            
+            if state_lines:
+                lines.append(f"    {state_kw} cs == {q}:")
+                state_kw = "elif"
+                lines += state_lines
         
-        stack_top = self.stack[-1]
-        key = (self.current_state, symbol, stack_top)
+        lines.append("    return False")
+        exec(compile("\n".join(lines), _STEP_FILENAME, "exec"), namespace)
         
-        if key not in self.delta:
-            return False
+        step = namespace["step"]
+        step.__doc__ = doc
+        return step
+    
+    @classmethod
+    def encode(cls, scanpath):
+        """
+        Translate a scanpath to an int8 array of symbol IDs.
+        
+        The result can be passed to run(), accepts(), get_max_stack_depth(),
+        compute_vcs(), analyze() and accepts_batch() in place of the
+        scanpath, so callers scoring the same scanpath repeatedly can
+        encode it once.
         
-        # Execute transition
-        new_state, stack_action = self.delta[key]
+        Args:
+            scanpath: String or list of symbols
+            
+        Returns:
+            np.ndarray: int8 symbol IDs (-1 for symbols not in Σ)
+        """
+        if isinstance(scanpath, str):
+            scanpath = scanpath.split()
+        
+        # map() over dict.get keeps the whole decode loop in C
+        return np.fromiter(map(cls.sym_id.get, scanpath, repeat(-1)),
+                           dtype=np.int8, count=len(scanpath))
+    
+    @classmethod
+    def _check_ids(cls, ids):
+        """
+        Validate a pre-encoded scanpath (integer array) and return it as int8.
+        
+        The Numba kernels index the compiled tables without bounds checks,
+        so IDs outside [-1, |Σ|) are rejected rather than cast or used.
+        """
+        if ids.ndim != 1:
+            raise ValueError("Encoded scanpath must be a 1-D array")
+        if ids.size and (ids.min() < -1 or ids.max() >= len(cls.sym_id)):
+            raise ValueError(f"Encoded scanpath contains symbol IDs outside "
+                             f"[-1, {len(cls.sym_id) - 1}]")
+        return ids.astype(np.int8, copy=False)
+    
+    @classmethod
+    def _normalize(cls, scanpath):
+        """
+        Bring a scanpath into one of the forms the runners take.
+        
+        Returns: the string itself, a tuple of symbols, or a validated int8
+                 array of symbol IDs (for integer arrays and sequences of
+                 integer IDs such as [[0, 5, 1], ...] rows)
+        """
+        if isinstance(scanpath, str):
+            return scanpath
+        if isinstance(scanpath, np.ndarray) and scanpath.dtype.kind in 'iu':
+            return cls._check_ids(scanpath)
+        
+        # Materialize iterators; encode() needs len()
+        scanpath = tuple(scanpath)
+        types = set(map(type, scanpath))
+        if any(issubclass(t, (int, np.integer)) for t in types):
+            if not all(issubclass(t, (int, np.integer)) for t in types):
+                raise TypeError("Scanpath mixes integer symbol IDs with other "
+                                "items; pass either symbols or IDs")
+            return cls._check_ids(np.array(scanpath, dtype=np.int64))
+        return scanpath
+    
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _run(cls, scanpath):
+        """
+        Run the compiled PDA over a whole scanpath.
+        
+        δ is immutable and shared by all instances of a class, so results
+        are memoized on (class, scanpath); the cache holds no instances.
+        
+        Args:
+            scanpath: String, tuple of symbols or bytes of encoded symbol IDs
+        
+        Returns: RunResult
+        """
+        if isinstance(scanpath, bytes):
+            ids = np.frombuffer(scanpath, dtype=np.int8)
+        else:
+            ids = cls.encode(scanpath)
+        
+        stack_buf = np.empty(len(ids) + 1, dtype=np.int8)
+        stack_buf[0] = cls._z0
+        state, max_depth, accepted, check_count = run_pda(
+            ids, cls._q0, cls._q6, cls._check, cls.dstate, cls.daction,
+            cls.dstay, cls.actions_flat, cls.actions_off, cls.actions_len,
+            stack_buf)
+        return RunResult(accepted, max_depth, cls.states[state], check_count)
+    
+    @property
+    def current_state(self):
+        """Name of the current state (e.g. 'q0')"""
+        return self.states[self._cs]
+    
+    @property
+    def stack(self):
+        """Current stack contents as symbol names, bottom first"""
+        return [self.stack_symbols[X] for X in self._stack[:self._sp]]
+    
+    def reset(self):
+        """Reset PDA to initial configuration"""
+        self._cs = self._q0
+        # Preallocated stack buffer; self._sp is the number of live entries
+        self._stack = bytearray(1024)
+        self._stack[0] = self._z0
+        self._sp = 1
+    
+    def run(self, scanpath):
+        """
+        Run the PDA over a whole scanpath in a single pass.
         
-        # Update state
-        self.current_state = new_state
+        Results are memoized per scanpath, so accepts(), get_max_stack_depth(),
+        compute_vcs() and analyze() on the same input execute the PDA once.
+        Symbols without a valid transition are skipped (and the scanpath is
+        rejected), so max_depth and final_state cover the whole input.
         
-        # Update stack: pop current top, push new symbols RIGHT TO LEFT
-        self.stack.pop()
-        # Reverse stack_action so rightmost symbol ends up on top
-        for symbol in reversed(stack_action):
-            self.stack.append(symbol)
+        Whole-scanpath methods (run, accepts, get_max_stack_depth,
+        compute_vcs, analyze) do not reset or update the step()-by-step
+        configuration: current_state, stack and get_stack_depth() keep
+        reflecting the last step() calls. Use final_state and max_depth
+        from the result instead.
         
-        return True
+        Args:
+            scanpath: String, list of symbols, or encoded integer array or
+                list of symbol IDs (see encode)
+            
+        Returns:
+            RunResult: (accepted, max_depth, final_state, verification_count)
+        """
+        scanpath = self._normalize(scanpath)
+        if isinstance(scanpath, np.ndarray):
+            scanpath = scanpath.tobytes()
+        return self._run(scanpath)
     
     def accepts(self, scanpath):
         """
@@ -146,33 +456,70 @@ class ECGPDA:
         - Final state is q6
         - Stack contains only Z0
         
+        Runs independently of step(): the current_state/stack configuration
+        is neither reset nor updated (see run()).
+        
         Args:
-            scanpath: String or list of symbols
+            scanpath: String, list of symbols, or encoded integer array or
+                list of symbol IDs (see encode)
             
         Returns:
             bool: True if scanpath accepted (complete verification)
         """
-        self.reset()
+        return self.run(scanpath).accepted
+    
+    def accepts_batch(self, scanpaths):
+        """
+        Check a whole corpus of scanpaths, in parallel across CPU cores.
         
-        # Convert to list if string
-        if isinstance(scanpath, str):
-            symbols = scanpath.split()
-        else:
-            symbols = scanpath
+        Args:
+            scanpaths: List of scanpaths (each a string, list of symbols,
+                or encoded array or list of symbol IDs)
+            
+        Returns:
+            np.ndarray: Boolean array, True where the scanpath is accepted
+        """
+        return self._run_batch(scanpaths)[0]
+    
+    def get_max_stack_depth_batch(self, scanpaths):
+        """
+        Compute the maximum stack depth of every scanpath in a corpus,
+        in parallel across CPU cores.
         
-        # Process each symbol
-        for symbol in symbols:
-            if not self.step(symbol):
-                return False
+        Args:
+            scanpaths: List of scanpaths (each a string, list of symbols,
+                or encoded array or list of symbol IDs)
+            
+        Returns:
+            np.ndarray: int64 array of maximum stack depths
+        """
+        return self._run_batch(scanpaths)[1]
+    
+    def _run_batch(self, scanpaths):
+        """
+        Run the PDA over many scanpaths with run_many.
         
-        # Check acceptance condition
-        # Accept if: final state is q6 AND Z0 is on the stack (allows remnants)
-        return (self.current_state in self.F and 
-                'Z0' in self.stack)
+        Returns: (accepted, max_depths) arrays, one entry per scanpath
+        """
+        encoded = []
+        for sp in scanpaths:
+            sp = self._normalize(sp)
+            encoded.append(sp if isinstance(sp, np.ndarray) else self.encode(sp))
+        
+        offs = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offs[1:] = np.cumsum([len(ids) for ids in encoded])
+        ids = np.concatenate(encoded) if encoded else np.empty(0, dtype=np.int8)
+        
+        out_accept = np.zeros(len(encoded), dtype=np.bool_)
+        out_depth = np.zeros(len(encoded), dtype=np.int64)
+        run_many(ids, offs, self._q0, self._q6, self._check, self._z0,
+                 self.dstate, self.daction, self.dstay, self.actions_flat,
+                 self.actions_off, self.actions_len, out_accept, out_depth)
+        return out_accept, out_depth
     
     def get_stack_depth(self):
         """Return current stack depth (excluding Z0)"""
-        return len(self.stack) - 1
+        return self._sp - 1
     
     def get_max_stack_depth(self, scanpath):
         """
@@ -182,26 +529,16 @@ class ECGPDA:
         - Experts (complete): mean 5.2, 95th percentile 7
         - Novices: mean 2.1, 95th percentile 3
         
+        Like accepts(), does not touch the step() configuration.
+        
         Args:
-            scanpath: String or list of symbols
+            scanpath: String, list of symbols, or encoded integer array or
+                list of symbol IDs (see encode)
             
         Returns:
             int: Maximum stack depth achieved
         """
-        self.reset()
-        max_depth = 0
-        
-        if isinstance(scanpath, str):
-            symbols = scanpath.split()
-        else:
-            symbols = scanpath
-        
-        for symbol in symbols:
-            self.step(symbol)
-            depth = self.get_stack_depth()
-            max_depth = max(max_depth, depth)
-        
-        return max_depth
+        return self.run(scanpath).max_depth
     
     def compute_vcs(self, scanpath):
         """
@@ -213,25 +550,128 @@ class ECGPDA:
         Simplified version based on verification symbols in scanpath.
         
         Args:
-            scanpath: String or list of symbols
+            scanpath: String, list of symbols, or encoded integer array or
+                list of symbol IDs (see encode)
             
         Returns:
             float: VCS score between 0 and 1
         """
-        if self.accepts(scanpath):
-            return 1.0
+        return self.analyze(scanpath)[2]
+    
+    def analyze(self, scanpath):
+        """
+        Compute acceptance, maximum stack depth and VCS in a single pass.
         
-        # Count verification confirmations
-        if isinstance(scanpath, str):
-            symbols = scanpath.split()
-        else:
-            symbols = scanpath
+        Equivalent to calling accepts(), get_max_stack_depth() and
+        compute_vcs() on the same scanpath, but splits, encodes and runs
+        the scanpath only once.
         
-        verification_count = symbols.count('✓')
+        Args:
+            scanpath: String, list of symbols, or encoded integer array or
+                list of symbol IDs (see encode)
+            
+        Returns:
+            tuple: (accepted, max_depth, vcs)
+        """
+        accepted, max_depth, final_state, check_count = self.run(scanpath)
+        
+        if accepted:
+            vcs = 1.0
+        else:
+            # Rough estimate: experts typically have 4-6 verifications
+            # for complete patterns
+            vcs = min(check_count / 6.0, 1.0)
         
-        # Rough estimate: experts typically have 4-6 verifications
-        # for complete patterns
-        return min(verification_count / 6.0, 1.0)
+        return accepted, max_depth, vcs
+
+
+# Compile δ and generate step() for ECGPDA itself; subclasses are compiled
+# by __init_subclass__
+ECGPDA._compile_transitions()
+
+
+# Numba's on-disk cache records the defining module by name, so a cache
+# written under "src.pda.automaton" cannot be loaded when this file runs as
+# a script (and vice versa); only cache the imported module.
+@njit(cache=__name__ != "__main__")
+def run_pda(ids, q0, qf, check, dstate, daction, dstay, actions_flat,
+            actions_off, actions_len, stack_buf):
+    """
+    Run the PDA over an encoded scanpath (JIT-compiled inner loop).
+    
+    Symbols without a valid transition are skipped so the maximum stack
+    depth covers the whole input, as in ECGPDA.get_max_stack_depth.
+    
+    Args:
+        ids: int8 array of input symbol IDs (-1 = not in Σ)
+        q0, qf: initial and accepting state IDs
+        check: ID of the verification confirmation symbol '✓'
+        dstate, daction, dstay, actions_flat, actions_off, actions_len:
+            compiled transition tables (see ECGPDA._compile_transitions)
+        stack_buf: int8 buffer of at least len(ids) + 1 entries, with the
+            initial stack symbol Z0 in stack_buf[0]
+            
+    Returns:
+        tuple: (final_state, max_depth, accepted, check_count)
+    """
+    z0 = stack_buf[0]
+    state = q0
+    sp = 1
+    max_depth = 0
+    check_count = 0
+    consumed = True
+    
+    for i in range(ids.shape[0]):
+        sid = ids[i]
+        if sid == check:
+            check_count += 1
+        new_state = -1
+        top = 0
+        if sid >= 0 and sp > 0:
+            top = stack_buf[sp - 1]
+            new_state = dstate[state, sid, top]
+        
+        if new_state < 0:
+            if sid < 0 or sp == 0 or not (dstay[state, top] >> sid) & 1:
+                consumed = False
+        else:
+            act = daction[state, sid, top]
+            state = new_state
+            sp -= 1
+            off = actions_off[act]
+            for j in range(actions_len[act]):
+                stack_buf[sp] = actions_flat[off + j]
+                sp += 1
+        
+        max_depth = max(max_depth, sp - 1)
+    
+    # Accept if: final state is q6 AND Z0 is on the stack (allows remnants).
+    # Every δ entry reading Z0 writes Z0 back in the same slot, so the bottom
+    # of the stack is always Z0 and checking stack_buf[0] suffices.
+    accepted = consumed and state == qf and sp > 0 and stack_buf[0] == z0
+    
+    return state, max_depth, accepted, check_count
+
+
+@njit(parallel=True, cache=__name__ != "__main__")
+def run_many(ids, offs, q0, qf, check, z0, dstate, daction, dstay,
+             actions_flat, actions_off, actions_len, out_accept, out_depth):
+    """
+    Run the PDA over many encoded scanpaths in parallel.
+    
+    Scanpath i is ids[offs[i]:offs[i + 1]]; its acceptance and maximum
+    stack depth are written to out_accept[i] and out_depth[i]. The other
+    arguments are as for run_pda.
+    """
+    for i in prange(offs.shape[0] - 1):
+        scanpath = ids[offs[i]:offs[i + 1]]
+        stack_buf = np.empty(scanpath.shape[0] + 1, dtype=np.int8)
+        stack_buf[0] = z0
+        _, max_depth, accepted, _ = run_pda(
+            scanpath, q0, qf, check, dstate, daction, dstay, actions_flat,
+            actions_off, actions_len, stack_buf)
+        out_accept[i] = accepted
+        out_depth[i] = max_depth
 
 
 def demo():
@@ -251,9 +691,7 @@ def demo():
     expert_pattern = "O R II P Q V ✓ ✓ O"
     print(f"Scanpath: {expert_pattern}")
     
-    accepted = pda.accepts(expert_pattern)
-    max_depth = pda.get_max_stack_depth(expert_pattern)
-    vcs = pda.compute_vcs(expert_pattern)
+    accepted, max_depth, vcs = pda.analyze(expert_pattern)
     
     print(f"Accepted: {accepted}")
     print(f"Max Stack Depth: {max_depth}")
@@ -268,9 +706,7 @@ def demo():
     novice_pattern = "O R II P Q"
     print(f"Scanpath: {novice_pattern}")
     
-    accepted = pda.accepts(novice_pattern)
-    max_depth = pda.get_max_stack_depth(novice_pattern)
-    vcs = pda.compute_vcs(novice_pattern)
+    accepted, max_depth, vcs = pda.analyze(novice_pattern)
     
     print(f"Accepted: {accepted}")
     print(f"Max Stack Depth: {max_depth}")
@@ -282,9 +718,7 @@ def demo():
     partial_pattern = "O R II P Q V ✓"
     print(f"Scanpath: {partial_pattern}")
     
-    accepted = pda.accepts(partial_pattern)
-    max_depth = pda.get_max_stack_depth(partial_pattern)
-    vcs = pda.compute_vcs(partial_pattern)
+    accepted, max_depth, vcs = pda.analyze(partial_pattern)
     
     print(f"Accepted: {accepted}")
     print(f"Max Stack Depth: {max_depth}")
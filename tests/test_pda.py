@@ -8,6 +8,9 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+import numpy as np
+import pytest
+
 from src.pda.automaton import ECGPDA
 
 
@@ -88,6 +91,261 @@ def test_reset_functionality():
     assert pda.stack == ['Z0']
 
 
+def test_instances_share_transitions():
+    """Test that δ is built once but each instance has its own configuration"""
+    pda1 = ECGPDA()
+    pda2 = ECGPDA()
+    assert pda1.delta is pda2.delta
+    assert pda1.dstate is pda2.dstate
+    
+    # Shared model and tables are read-only
+    with pytest.raises(TypeError):
+        pda1.delta[('q0', 'O', 'Z0')] = ('q6', ('Z0',))
+    with pytest.raises(AttributeError):
+        pda1.sigma_leads.append('V7')
+    with pytest.raises(ValueError):
+        pda1.dstate[0, 0, 0] = 0
+    
+    pda1.step('O')
+    pda1.step('R')
+    assert pda1.current_state == 'q2'
+    assert pda2.current_state == 'q0'
+    assert pda2.stack == ['Z0']
+
+
+def test_analyze_matches_individual_metrics():
+    """Test that analyze() agrees with accepts/get_max_stack_depth/compute_vcs"""
+    pda = ECGPDA()
+    patterns = [
+        "O R II P Q S T V1 P Q V II ✓ V1 ✓ O",
+        "O R II P Q V1 P",
+        "O R II P Q V ✓",
+        "O R II P X ✓ ✓",
+        "",
+    ]
+    
+    for pattern in patterns:
+        expected = (pda.accepts(pattern),
+                    pda.get_max_stack_depth(pattern),
+                    pda.compute_vcs(pattern))
+        assert pda.analyze(pattern) == expected
+        assert pda.analyze(pattern.split()) == expected
+
+
+def test_run_result():
+    """Test that run() reports all metrics from one memoized pass"""
+    pda = ECGPDA()
+    expert_pattern = "O R II P Q S T V1 P Q V II ✓ V1 ✓ O"
+    
+    result = pda.run(expert_pattern)
+    assert result.accepted
+    assert result.final_state == 'q6'
+    assert result.max_depth == pda.get_max_stack_depth(expert_pattern)
+    assert result.verification_count == 2
+    
+    # List input gives the same result; repeated calls are served from cache
+    assert pda.run(expert_pattern.split()) == result
+    assert pda.run(expert_pattern) is result
+
+
+def test_step_matches_delta():
+    """Test that the generated step() applies δ exactly"""
+    pda = ECGPDA()
+    scanpath = "O O R R II P X Q V1 S T V V1 P ✓ ✓ II ✓ ✓ O O".split()
+    
+    # Reference interpreter straight from the δ dictionary
+    state, stack = 'q0', ['Z0']
+    for symbol in scanpath:
+        transition = pda.delta.get((state, symbol, stack[-1]))
+        assert pda.step(symbol) == (transition is not None)
+        if transition is not None:
+            state, stack_action = transition
+            stack = stack[:-1] + list(reversed(stack_action))
+        
+        assert pda.current_state == state
+        assert pda.stack == stack
+
+
+def test_subclass_step():
+    """Test that subclasses keep their own step() and get their own δ"""
+    class LoggingPDA(ECGPDA):
+        def step(self, symbol):
+            self.seen.append(symbol)
+            return super().step(symbol)
+    
+    class NoRhythmPDA(ECGPDA):
+        @classmethod
+        def _build_transitions(cls):
+            delta = dict(ECGPDA._build_transitions())
+            del delta[('q1', 'R', 'Z0')]
+            return delta
+    
+    # step() is generated when the class is defined, not by instances
+    assert 'step' in ECGPDA.__dict__
+    
+    pda = LoggingPDA()
+    pda.seen = []
+    assert pda.step('O') and pda.step('R')
+    assert pda.seen == ['O', 'R']
+    assert pda.current_state == 'q2'
+    
+    pda = NoRhythmPDA()
+    assert pda.step('O')
+    assert not pda.step('R')
+    assert not pda.accepts("O R II P Q V ✓ ✓ O")
+    assert ECGPDA().accepts("O R II P Q V ✓ ✓ O")
+
+
+def test_encoded_scanpath():
+    """Test that pre-encoded scanpaths give the same results as strings"""
+    pda = ECGPDA()
+    
+    for pattern in ["O R II P Q S T V1 P Q V II ✓ V1 ✓ O", "O R II P Q V1 P"]:
+        ids = pda.encode(pattern)
+        assert ids.dtype == 'int8'
+        assert pda.run(ids) == pda.run(pattern)
+        assert pda.analyze(ids) == pda.analyze(pattern)
+    
+    assert pda.encode("O X").tolist() == [pda.sym_id['O'], -1]
+    
+    # encode() and the memoized run work on the class, before any instance
+    class FreshPDA(ECGPDA):
+        pass
+    
+    ids = FreshPDA.encode("O R II P Q V ✓ ✓ O")
+    assert ids.tolist() == pda.encode("O R II P Q V ✓ ✓ O").tolist()
+    assert FreshPDA._run(ids.tobytes()) == pda.run(ids)
+    
+    # Arrays of symbol strings are scanpaths, not encoded IDs
+    symbols = np.array("O R II P Q V ✓ ✓ O".split())
+    assert pda.accepts(symbols)
+    assert pda.accepts_batch([symbols]).tolist() == [True]
+    
+    # Out-of-range IDs are rejected instead of indexing past the tables
+    n_sigma = len(pda.sym_id)
+    for bad in [np.array([0, n_sigma], dtype=np.int8),
+                np.array([-2], dtype=np.int8),
+                np.array([300], dtype=np.int64)]:
+        with pytest.raises(ValueError):
+            pda.run(bad)
+        with pytest.raises(ValueError):
+            pda.accepts_batch([bad])
+
+
+def test_accepts_batch():
+    """Test that batch runs agree with per-scanpath accepts()/depths"""
+    pda = ECGPDA()
+    patterns = [
+        "O R II P Q S T V1 P Q V II ✓ V1 ✓ O",
+        "O R II P Q V1 P",
+        "O R II P Q V ✓ ✓ O".split(),
+        "",
+    ]
+    
+    result = pda.accepts_batch(patterns + [pda.encode(patterns[0])])
+    assert result.tolist() == [pda.accepts(p) for p in patterns] + [True]
+    assert pda.accepts_batch([]).shape == (0,)
+    
+    depths = pda.get_max_stack_depth_batch(patterns)
+    assert depths.tolist() == [pda.get_max_stack_depth(p) for p in patterns]
+    
+    # Iterator items are materialized like in accepts()
+    result = pda.accepts_batch([iter(patterns[0].split())])
+    assert result.tolist() == [pda.accepts(iter(patterns[0].split()))]
+    
+    # Lists of integer symbol IDs are taken as encoded scanpaths
+    id_lists = [pda.encode(p).tolist() for p in patterns]
+    assert pda.accepts_batch(id_lists).tolist() == [pda.accepts(p) for p in patterns]
+    assert [pda.accepts(ids) for ids in id_lists] == [pda.accepts(p) for p in patterns]
+    assert pda.get_max_stack_depth_batch(id_lists).tolist() == depths.tolist()
+    with pytest.raises(TypeError):
+        pda.accepts(['O', pda.sym_id['R']])
+    with pytest.raises(ValueError):
+        pda.accepts_batch([[0, len(pda.sym_id)]])
+
+
+def equivalent_states(pda):
+    """
+    Partition Q into classes of equivalent states (Moore/Hopcroft-style
+    partition refinement on transition signatures).
+    
+    Two states share a class when they agree on membership in F and,
+    for every (symbol, stack_top), perform the same stack action and
+    move to states of the same class.
+    """
+    keys = sorted({(symbol, stack_top) for (_, symbol, stack_top) in pda.delta})
+    block = {q: int(q in pda.F) for q in pda.Q}
+    
+    while True:
+        signatures = {}
+        for q in sorted(pda.Q):
+            row = []
+            for symbol, stack_top in keys:
+                transition = pda.delta.get((q, symbol, stack_top))
+                if transition is None:
+                    row.append(None)
+                else:
+                    new_state, stack_action = transition
+                    row.append((block[new_state], tuple(stack_action)))
+            signatures[q] = (block[q], tuple(row))
+        
+        class_ids = {}
+        refined = {q: class_ids.setdefault(sig, len(class_ids))
+                   for q, sig in signatures.items()}
+        if len(class_ids) == len(set(block.values())):
+            break
+        block = refined
+    
+    classes = {}
+    for q in sorted(pda.Q):
+        classes.setdefault(refined[q], set()).add(q)
+    return list(classes.values())
+
+
+def test_states_are_minimal():
+    """Test that no two states of the 7-state PDA are equivalent"""
+    pda = ECGPDA()
+    
+    classes = equivalent_states(pda)
+    assert len(classes) == len(pda.Q)
+    assert set().union(*classes) == pda.Q
+
+
+def test_compiled_transitions_match_delta():
+    """Test that the compiled tables reproduce δ with pre-reversed pushes"""
+    pda = ECGPDA()
+    n_stay = 0
+    
+    for (state, symbol, stack_top), (new_state, stack_action) in pda.delta.items():
+        idx = (pda.state_id[state], pda.sym_id[symbol], pda.stack_id[stack_top])
+        
+        if new_state == state and stack_action == (stack_top,):
+            # No-op transitions live in the stay bitmask, not the dense table
+            assert pda.dstate[idx] == -1
+            assert pda.dstay[idx[0], idx[2]] >> idx[1] & 1
+            n_stay += 1
+            continue
+        
+        assert pda.states[pda.dstate[idx]] == new_state
+        push = pda.actions_tbl[pda.daction[idx]]
+        assert [pda.stack_symbols[X] for X in push] == list(reversed(stack_action))
+    
+    assert (pda.dstate >= 0).sum() + n_stay == len(pda.delta)
+    assert sum(bin(mask).count('1') for mask in pda.dstay.ravel().tolist()) == n_stay
+
+
+def test_scanpath_runs_leave_step_configuration():
+    """Test that accepts()/get_max_stack_depth() don't touch step() state"""
+    pda = ECGPDA()
+    pda.step('O')
+    
+    assert pda.accepts("O R II P Q V ✓ ✓ O")
+    assert pda.get_max_stack_depth("O R II P Q S T") > 0
+    assert pda.current_state == 'q1'
+    assert pda.stack == ['Z0']
+    assert pda.get_stack_depth() == 0
+
+
 if __name__ == "__main__":
     print("Running tests...")
     test_pda_initialization()
@@ -114,4 +372,34 @@ if __name__ == "__main__":
     test_reset_functionality()
     print("✓ Reset functionality")
     
+    test_instances_share_transitions()
+    print("✓ Instances share transitions")
+    
+    test_analyze_matches_individual_metrics()
+    print("✓ analyze() matches individual metrics")
+    
+    test_run_result()
+    print("✓ run() result")
+    
+    test_step_matches_delta()
+    print("✓ step() matches δ")
+    
+    test_subclass_step()
+    print("✓ Subclass step()")
+    
+    test_encoded_scanpath()
+    print("✓ Encoded scanpaths")
+    
+    test_accepts_batch()
+    print("✓ Batch acceptance")
+    
+    test_states_are_minimal()
+    print("✓ States are minimal")
+    
+    test_compiled_transitions_match_delta()
+    print("✓ Compiled transitions match δ")
+    
+    test_scanpath_runs_leave_step_configuration()
+    print("✓ Scanpath runs leave step() configuration")
+    
     print("\nAll tests passed! ✓")